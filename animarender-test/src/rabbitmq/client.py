@@ -4,7 +4,10 @@ import uuid
 
 import pika
 import tornado.concurrent
+import tornado.ioloop
 
+from rabbitmq.data import BATCH_TYPE
+from rabbitmq.data import build_batch_request
 from rabbitmq.data import build_request
 
 LOGGER = logging.getLogger(__name__)
@@ -15,12 +18,18 @@ class RabbitMQClient:
     Implements asynchronous RPC producer on top of RabbitMQ. It sends requests
     to ``CLIENT_QUEUE`` message queue and waits asynchronously for responses
     to ``SERVER_QUEUE`` message queue.
+
+    Optionally, calls to the same method can be batched: they are collected
+    for up to ``batch_window`` seconds or until ``batch_size`` calls are
+    pending, and then sent as a single batch request (see:
+    ``rabbitmq.data.build_batch_request``).
     """
 
     CLIENT_QUEUE = 'client_queue'  # From the core to the service.
     SERVER_QUEUE = 'server_queue'  # From the service to the core.
 
-    def __init__(self, host='localhost', port=5672, username='guest', password='guest'):
+    def __init__(self, host='localhost', port=5672, username='guest', password='guest',
+                 batch_size=1, batch_window=0.0):
         """
         Creates a new instance of ``RabbitMQClient`` with specified connection
         parameters and user credentials.
@@ -29,11 +38,17 @@ class RabbitMQClient:
         :param int port: RabbitMQ server port.
         :param str username: RabbitMQ username.
         :param str password: RabbitMQ password.
+        :param int batch_size: Maximum number of calls in one batch request.
+            Batching is disabled if it is less than 2.
+        :param float batch_window: Maximum time in seconds a call can wait
+            for other calls before its batch is sent.
         """
         self._host = host
         self._port = port
         self._username = username
         self._password = password
+        self._batch_size = batch_size
+        self._batch_window = batch_window
 
         self._connection = pika.TornadoConnection(
             pika.ConnectionParameters(
@@ -51,24 +66,114 @@ class RabbitMQClient:
         self._client_queue = None
         self._server_queue = None
         self._pending_requests = dict()
+        self._pending_batches = dict()
+        self._batch_timeouts = dict()
 
     def call(self, method, *args, **kwargs):
         """
         Sends and RPC request to ``SERVER_QUEUE`` message queue and returns
         ``tornado.concurrent.Future`` with the result of this request.
+        If batching is enabled, the request is queued and sent later as a part
+        of a batch request.
 
         :param str method: Method to call.
         :param args: Method arguments.
         :param kwargs: Method keyword arguments.
         :return tornado.concurrent.Future: Future with response object.
         """
-        request = build_request(method, *args, **kwargs)
-        request_id = str(uuid.uuid4())
-        request_json = json.dumps(request)
         request_future = tornado.concurrent.Future()
-        self._pending_requests[request_id] = request_future
 
-        LOGGER.info('Sending a request "%s" to RabbitMQ (ID: %s)', method, request_id)
+        if self._batch_size < 2:
+            request = build_request(method, *args, **kwargs)
+            self._publish(method, json.dumps(request), request_future)
+            return request_future
+
+        batch = self._pending_batches.setdefault(method, [])
+        batch.append((args, kwargs, request_future))
+        if len(batch) >= self._batch_size:
+            self._flush_batch(method)
+        elif len(batch) == 1:
+            self._batch_timeouts[method] = tornado.ioloop.IOLoop.current().call_later(
+                self._batch_window, self._flush_batch, method,
+            )
+
+        return request_future
+
+    def _flush_batch(self, method):
+        """
+        Sends all pending calls of the ``method`` as a single batch request.
+        It is called either when the batch is full or when the batch window
+        expires. Calls which can't be encoded to JSON fail on their own and
+        are left out of the batch. If the batch can't be sent, every call
+        in it fails with the same exception.
+
+        :param str method: Method to call.
+        """
+        timeout = self._batch_timeouts.pop(method, None)
+        if timeout is not None:
+            tornado.ioloop.IOLoop.current().remove_timeout(timeout)
+
+        batch = self._pending_batches.pop(method, None)
+        if not batch:
+            return
+
+        calls = [(args, kwargs) for args, kwargs, _ in batch]
+        try:
+            request_json = json.dumps(build_batch_request(method, calls))
+        except (TypeError, ValueError):
+            batch = self._drop_unencodable(method, batch)
+            if not batch:
+                return
+            calls = [(args, kwargs) for args, kwargs, _ in batch]
+            request_json = json.dumps(build_batch_request(method, calls))
+
+        request_futures = [request_future for _, _, request_future in batch]
+        try:
+            self._publish(method, request_json, request_futures)
+        except Exception as e:
+            LOGGER.exception('Failed to send a batch of %d requests "%s"', len(batch), method)
+            for request_future in request_futures:
+                request_future.set_exception(e)
+
+    @staticmethod
+    def _drop_unencodable(method, batch):
+        """
+        Fails every call of the ``batch`` which can't be encoded to JSON,
+        so that a single bad call doesn't fail the other calls.
+
+        :param str method: Method to call.
+        :param list batch: List of ``(args, kwargs, future)`` tuples.
+        :return list: Calls of the ``batch`` which can be encoded to JSON.
+        """
+        encodable = []
+        for args, kwargs, request_future in batch:
+            try:
+                json.dumps(build_request(method, *args, **kwargs))
+            except (TypeError, ValueError) as e:
+                LOGGER.warning('Dropped a request "%s" from batch: %s', method, e)
+                request_future.set_exception(e)
+            else:
+                encodable.append((args, kwargs, request_future))
+        return encodable
+
+    def _publish(self, method, request_json, pending):
+        """
+        Publishes an encoded request object to ``CLIENT_QUEUE`` message queue
+        under a new request ID and registers ``pending`` to be resolved with
+        the response. ``pending`` is registered only if the request was
+        published successfully.
+
+        :param str method: Method to call.
+        :param str request_json: Encoded request or batch request object.
+        :param pending: Future or list of futures (for batch requests).
+        """
+        request_id = str(uuid.uuid4())
+
+        if isinstance(pending, list):
+            LOGGER.info('Sending a batch of %d requests "%s" to RabbitMQ (ID: %s)',
+                        len(pending), method, request_id)
+        else:
+            LOGGER.info('Sending a request "%s" to RabbitMQ (ID: %s)', method, request_id)
         self._channel.basic_publish(
             exchange='',
             routing_key=self._client_queue,
@@ -78,8 +183,7 @@ class RabbitMQClient:
                 correlation_id=request_id,
             )
         )
-
-        return request_future
+        self._pending_requests[request_id] = pending
 
     def _on_connection_open(self, connection):
         """
@@ -155,7 +259,8 @@ class RabbitMQClient:
         """
         This method is called when a new message is received on ``CLIENT_QUEUE``
         message queue. It resolves a future instance corresponding
-        to the original request ID.
+        to the original request ID. Responses to batch requests are fanned out
+        to the futures of individual calls by their index in the batch.
 
         :param pika.Channel channel: Receiving channel.
         :param pika.spec.Basic.Deliver method: Message deliver.
@@ -166,7 +271,27 @@ class RabbitMQClient:
         response = json.loads(response_json)
         response_id = properties.correlation_id
         LOGGER.info('Received a response (ID: %s)', response_id)
-        request = self._pending_requests.get(response_id)
-        if request is not None:
+        request = self._pending_requests.pop(response_id, None)
+        if request is None:
+            return
+
+        if not isinstance(request, list):
             request.set_result(response)
-            self._pending_requests.pop(response_id)
+        elif (isinstance(response, dict) and response.get('type') == BATCH_TYPE
+                and isinstance(response.get('batch'), list)):
+            if len(response['batch']) != len(request):
+                LOGGER.warning('Expected %d responses in batch, received %d (ID: %s)',
+                               len(request), len(response['batch']), response_id)
+            for request_future, item in zip(request, response['batch']):
+                request_future.set_result(item)
+            for request_future in request[len(response['batch']):]:
+                request_future.set_exception(
+                    RuntimeError('Missing response in batch (ID: %s)' % response_id)
+                )
+        else:
+            # The server didn't respond with a batch response, e.g. it does not
+            # support batches, so none of the calls has a result.
+            for request_future in request:
+                request_future.set_exception(
+                    RuntimeError('Invalid response to batch request (ID: %s)' % response_id)
+                )
@@ -1,3 +1,8 @@
+# Marks batch request and batch response objects so that they can be told
+# apart from regular ones (see: ``build_batch_request``, ``build_batch_response``).
+BATCH_TYPE = 'batch'
+
+
 def build_request(method, *args, **kwargs):
     """
     Creates a request object with with specified method name, positional
@@ -17,6 +22,26 @@ def build_request(method, *args, **kwargs):
         'kwargs': kwargs,
     }
 
+def build_batch_request(method, calls):
+    """
+    Creates a batch request object which wraps several calls of the same
+    method into a single message. Calls are kept in their original order,
+    so the server is expected to respond with results at matching indices
+    (see: ``build_batch_response``).
+
+    :param str method: Method name.
+    :param list calls: List of ``(args, kwargs)`` tuples, one per call.
+    :return dict: A batch request object with following fields:
+        - type (always ``BATCH_TYPE``)
+        - method
+        - batch (list of request objects, see: ``build_request``)
+    """
+    return {
+        'type'  : BATCH_TYPE,
+        'method': method,
+        'batch' : [build_request(method, *args, **kwargs) for args, kwargs in calls],
+    }
+
 def build_response(status_code, status_text, data):
     """
     Creates a response object with specified status code, status code
@@ -35,3 +60,19 @@ def build_response(status_code, status_text, data):
         'status_text': status_text,
         'data': data,
     }
+
+def build_batch_response(responses):
+    """
+    Creates a batch response object which wraps responses to every request
+    of a batch request. Responses must be in the same order as requests
+    in the original batch (see: ``build_batch_request``).
+
+    :param list responses: List of response objects (see: ``build_response``).
+    :return dict: A batch response object with following fields:
+        - type (always ``BATCH_TYPE``)
+        - batch
+    """
+    return {
+        'type' : BATCH_TYPE,
+        'batch': responses,
+    }
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Application modules are imported relative to ``src`` (see: ``src/main.py``).
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
@@ -0,0 +1,171 @@
+# These tests were run with pytest 9.1.1, tornado 6.5.10 and pika 1.4.4 on
+# Python 3.11: the pinned tornado 4.5.2 and pika 0.11.0 can't be imported there.
+# ``pika.TornadoConnection`` is stubbed, since pika 1.x no longer exports it.
+import json
+import types
+from unittest import mock
+
+import tornado.gen
+import tornado.testing
+
+from rabbitmq import RabbitMQClient
+from rabbitmq.data import BATCH_TYPE
+from rabbitmq.data import build_batch_response
+from rabbitmq.data import build_request
+from rabbitmq.data import build_response
+
+
+class RabbitMQClientBatchTest(tornado.testing.AsyncTestCase):
+    """
+    Tests for batching of RPC calls in ``RabbitMQClient``. Connection to
+    RabbitMQ server is stubbed, published messages are recorded by a mock
+    channel.
+    """
+
+    def setUp(self):
+        super().setUp()
+        with mock.patch('pika.TornadoConnection', create=True):
+            self.client = RabbitMQClient(batch_size=3, batch_window=0.01)
+        self.channel = mock.Mock()
+        self.client._channel = self.channel
+
+    def published(self):
+        """
+        :return list: ``(request, correlation_id)`` for every published message.
+        """
+        return [
+            (json.loads(call[1]['body']), call[1]['properties'].correlation_id)
+            for call in self.channel.basic_publish.call_args_list
+        ]
+
+    def respond(self, correlation_id, response):
+        self.client._consumer_callback(
+            None, None,
+            types.SimpleNamespace(correlation_id=correlation_id),
+            json.dumps(response).encode(),
+        )
+
+    def respond_to_batch(self, request, correlation_id):
+        responses = [build_response(200, 'OK', item['args']) for item in request['batch']]
+        self.respond(correlation_id, build_batch_response(responses))
+
+    @tornado.testing.gen_test
+    def test_flush_on_full_batch(self):
+        futures = [self.client.call('echo', i) for i in range(3)]
+        [(request, correlation_id)] = self.published()
+        self.assertEqual(request['type'], BATCH_TYPE)
+        self.assertEqual(request['method'], 'echo')
+        self.assertEqual([item['args'] for item in request['batch']], [[0], [1], [2]])
+
+        self.respond_to_batch(request, correlation_id)
+        results = yield futures
+        self.assertEqual([result['data'] for result in results], [[0], [1], [2]])
+        self.assertEqual(self.client._pending_requests, {})
+
+    @tornado.testing.gen_test
+    def test_flush_on_window_expiry(self):
+        futures = [self.client.call('echo', i) for i in range(2)]
+        self.assertEqual(self.published(), [])
+
+        yield tornado.gen.sleep(0.05)
+        [(request, correlation_id)] = self.published()
+        self.assertEqual(len(request['batch']), 2)
+
+        self.respond_to_batch(request, correlation_id)
+        results = yield futures
+        self.assertEqual([result['data'] for result in results], [[0], [1]])
+
+    @tornado.testing.gen_test
+    def test_short_batch_response(self):
+        futures = [self.client.call('echo', i) for i in range(3)]
+        [(request, correlation_id)] = self.published()
+
+        self.respond(correlation_id, build_batch_response([build_response(200, 'OK', 0)]))
+        result = yield futures[0]
+        self.assertEqual(result['data'], 0)
+        for future in futures[1:]:
+            with self.assertRaises(RuntimeError):
+                yield future
+
+    @tornado.testing.gen_test
+    def test_invalid_batch_response(self):
+        futures = [self.client.call('echo', i) for i in range(3)]
+        [(request, correlation_id)] = self.published()
+
+        self.respond(correlation_id, 'batch')
+        for future in futures:
+            with self.assertRaises(RuntimeError):
+                yield future
+
+    @tornado.testing.gen_test
+    def test_non_list_batch_response(self):
+        for batch in [None, {'0': 0}, 'abc']:
+            futures = [self.client.call('echo', i) for i in range(3)]
+            request, correlation_id = self.published()[-1]
+
+            self.respond(correlation_id, {'type': BATCH_TYPE, 'batch': batch})
+            for future in futures:
+                with self.assertRaises(RuntimeError):
+                    yield future
+        self.assertEqual(self.client._pending_requests, {})
+
+    @tornado.testing.gen_test
+    def test_serialisation_error_fails_only_bad_call(self):
+        futures = [self.client.call('echo', 0), self.client.call('echo', object())]
+        futures.append(self.client.call('echo', 2))
+
+        with self.assertRaises(TypeError):
+            yield futures[1]
+        [(request, correlation_id)] = self.published()
+        self.assertEqual([item['args'] for item in request['batch']], [[0], [2]])
+
+        self.respond_to_batch(request, correlation_id)
+        results = yield [futures[0], futures[2]]
+        self.assertEqual([result['data'] for result in results], [[0], [2]])
+
+    @tornado.testing.gen_test
+    def test_publish_error_fails_whole_batch(self):
+        self.client._channel = None
+        futures = [self.client.call('echo', i) for i in range(2)]
+
+        yield tornado.gen.sleep(0.05)
+        for future in futures:
+            with self.assertRaises(AttributeError):
+                yield future
+        self.assertEqual(self.client._pending_requests, {})
+
+
+class RabbitMQClientTest(tornado.testing.AsyncTestCase):
+    """
+    Tests for RPC calls in ``RabbitMQClient`` with batching disabled.
+    """
+
+    def setUp(self):
+        super().setUp()
+        with mock.patch('pika.TornadoConnection', create=True):
+            self.client = RabbitMQClient()
+        self.channel = mock.Mock()
+        self.client._channel = self.channel
+
+    @tornado.testing.gen_test
+    def test_call(self):
+        futures = [self.client.call('echo', i, key=i) for i in range(2)]
+        self.assertEqual(self.channel.basic_publish.call_count, 2)
+
+        for i, call in enumerate(self.channel.basic_publish.call_args_list):
+            request = json.loads(call[1]['body'])
+            self.assertEqual(request, json.loads(json.dumps(build_request('echo', i, key=i))))
+            self.client._consumer_callback(
+                None, None, call[1]['properties'],
+                json.dumps(build_response(200, 'OK', i)).encode(),
+            )
+
+        results = yield futures
+        self.assertEqual([result['data'] for result in results], [0, 1])
+        self.assertEqual(self.client._pending_requests, {})
+
+    def test_serialisation_error(self):
+        with self.assertRaises(TypeError):
+            self.client.call('echo', object())
+        self.channel.basic_publish.assert_not_called()
+        self.assertEqual(self.client._pending_requests, {})